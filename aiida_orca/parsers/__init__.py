@@ -1,16 +1,98 @@
 # -*- coding: utf-8 -*-
 """AiiDA-ORCA output parser"""
-import numpy as np
+import io
 
-from pymatgen.core import Molecule
+import numpy as np
 
 from aiida.parsers import Parser
 from aiida.common import OutputParsingError, NotExistent
 from aiida.engine import ExitCode
 from aiida.orm import Dict, StructureData
 
+from .cclib.data import ccData
 from .cclib.utils import PeriodicTable
-from .cclib.ccio import ccread
+
+_PT = PeriodicTable()
+_ELEMENT_ARR = np.array(_PT.element, dtype=object)
+_FLOAT_MAX = np.finfo(np.float64).max
+_FLOAT_MIN = np.finfo(np.float64).min
+
+
+def _structure_from_xyz(content: str, margin: float = 5) -> StructureData:
+    """Build a non-periodic `StructureData` from the content of an XYZ file.
+
+    The molecule is placed in an orthorhombic box that leaves `margin` Angstrom of vacuum on each side, with the
+    same cell as `StructureData(pymatgen_molecule=...)`. Unlike that route, the molecule is centered on its
+    geometric center rather than its center of mass, and the atoms keep the order of the XYZ file instead of
+    being reordered by pymatgen.
+
+    Args:
+        content (str): Content of the XYZ file
+        margin (float): Vacuum around the molecule in Angstrom
+
+    Returns:
+        StructureData: Structure of the molecule
+    """
+    lines = content.splitlines()
+    num_atoms = int(lines[0])
+
+    symbols = []
+    positions = []
+    for line in lines[2:2 + num_atoms]:
+        symbol, pos_x, pos_y, pos_z = line.split()[:4]
+        symbols.append(symbol)
+        positions.append((float(pos_x), float(pos_y), float(pos_z)))
+
+    coords = np.array(positions)
+    lower = coords.min(axis=0)
+    upper = coords.max(axis=0)
+    box = upper - lower + 2 * margin
+    coords += box / 2 - (lower + upper) / 2
+
+    structure = StructureData(cell=np.diag(box).tolist(), pbc=(False, False, False))
+    for symbol, position in zip(symbols, coords.tolist()):
+        structure.append_atom(symbols=symbol, position=position)
+
+    return structure
+
+
+def _remove_nan(parsed_dictionary: dict) -> dict:
+    """cclib parsed object may contain nan values in ndarray.
+    It will results in an exception in aiida-core which comes from
+    json serialization and thereofore dictionary cannot be stored.
+    This removes nan values to remedy this issue.
+    See:
+    https://github.com/aiidateam/aiida-core/issues/2412
+    https://github.com/aiidateam/aiida-core/issues/3450
+
+    Args:
+        parsed_dictionary (dict): Parsed dictionary from `cclib`
+
+    Returns:
+        dict: Parsed dictionary without `NaN`
+    """
+
+    for value in parsed_dictionary.values():
+        # Integer arrays such as `atomnos` can never hold `NaN` or `inf`
+        if not isinstance(value, np.ndarray) or value.dtype.kind != 'f':
+            continue
+        # The sum of an array is finite only if all of its elements are, which checks the common case of a
+        # clean array without allocating a mask. An overflowing sum simply falls through to the full check.
+        with np.errstate(over='ignore', invalid='ignore'):
+            if np.isfinite(value.sum()):
+                continue
+        invalid = ~np.isfinite(value)
+        if not invalid.any():
+            continue
+        # Only the invalid entries are classified, so the full array is scanned once. Values are replaced
+        # in place, the dictionary already holds the reference to the array.
+        bad_values = value[invalid]
+        np.putmask(bad_values, np.isnan(bad_values), 123456789)
+        np.putmask(bad_values, np.isposinf(bad_values), _FLOAT_MAX)
+        np.putmask(bad_values, np.isneginf(bad_values), _FLOAT_MIN)
+        value[invalid] = bad_values
+
+    return parsed_dictionary
 
 
 class OrcaBaseParser(Parser):
@@ -24,66 +106,61 @@ class OrcaBaseParser(Parser):
         If it would be an optimization run, the relaxed structure also will
         be stored under relaxed_structure key.
         """
+        # The ORCA parser module is only loaded when actually parsing, not when the entry point is loaded
+        from .cclib.ccio import ccread
 
         try:
             out_folder = self.retrieved
         except NotExistent:
             return self.exit_codes.ERROR_NO_RETRIEVED_FOLDER
 
-        fname_out = self.node.process_class._OUTPUT_FILE  #pylint: disable=protected-access
-        fname_relaxed = self.node.process_class._RELAX_COORDS_FILE  #pylint: disable=protected-access
-        # fname_traj = self.node.process_class._TRAJECTORY_FILE  #pylint: disable=protected-access
-        # fname_hessian = self.node.process_class._HESSIAN_FILE  #pylint: disable=protected-access
+        process_class = self.node.process_class
+        fname_out = process_class._OUTPUT_FILE  #pylint: disable=protected-access
+        fname_relaxed = process_class._RELAX_COORDS_FILE  #pylint: disable=protected-access
+        # fname_traj = process_class._TRAJECTORY_FILE  #pylint: disable=protected-access
+        # fname_hessian = process_class._HESSIAN_FILE  #pylint: disable=protected-access
 
-        if fname_out not in out_folder._repository.list_object_names():  #pylint: disable=protected-access
+        try:
+            handler = out_folder.open(fname_out, 'rb')
+        except FileNotFoundError:
             raise OutputParsingError('Orca output file not retrieved')
 
         try:
-            with self.retrieved.open(fname_out) as handler:
-                parsed_obj = ccread(handler.name)
+            # Decode like `cclib.logfileparser.openlogfile` does, ignoring bytes that cannot be decoded
+            with io.TextIOWrapper(handler, errors='ignore') as stream:
+                parsed_obj = ccread(stream)
                 parsed_dict = parsed_obj.getattributes()
         except OutputParsingError:  #pylint: disable=bare-except
             return self.exit_codes.ERROR_OUTPUT_PARSING
 
-        def _remove_nan(parsed_dictionary: dict) -> dict:
-            """cclib parsed object may contain nan values in ndarray.
-            It will results in an exception in aiida-core which comes from
-            json serialization and thereofore dictionary cannot be stored.
-            This removes nan values to remedy this issue.
-            See:
-            https://github.com/aiidateam/aiida-core/issues/2412
-            https://github.com/aiidateam/aiida-core/issues/3450
-
-            Args:
-                parsed_dictionary (dict): Parsed dictionary from `cclib`
-
-            Returns:
-                dict: Parsed dictionary without `NaN`
-            """
-
-            for key, value in parsed_dictionary.items():
-                if isinstance(value, np.ndarray):
-                    non_nan_value = np.nan_to_num(value, nan=123456789, posinf=2e308, neginf=-2e308)
-                    parsed_dictionary.update({key: non_nan_value})
-
-            return parsed_dictionary
-
         output_dict = _remove_nan(parsed_dict)
 
         # keywords = output_dict['metadata']['keywords']
 
         if parsed_dict.get('optdone', False):
             with out_folder.open(fname_relaxed) as handler:
-                relaxed_structure = StructureData(pymatgen_molecule=Molecule.from_file(handler.name))
+                relaxed_structure = _structure_from_xyz(handler.read())
             self.out('relaxed_structure', relaxed_structure)
             # relaxation_trajectory = SinglefileData(
             #     file=os.path.join(out_folder._repository._get_base_folder().abspath, fname_traj)  #pylint: disable=protected-access
             # )
             # self.out('relaxation_trajectory', relaxation_trajectory)
 
-        pt = PeriodicTable()  #pylint: disable=invalid-name
-
-        output_dict['elements'] = [pt.element[Z] for Z in output_dict['atomnos'].tolist()]
+        atomnos = output_dict['atomnos']
+        if atomnos.size and (atomnos == atomnos[0]).all():
+            output_dict['elements'] = [_PT.element[atomnos[0]]] * atomnos.size
+        else:
+            output_dict['elements'] = _ELEMENT_ARR[atomnos].tolist()
+
+        # Convert arrays to lists following the rules of `ccData.listify`. aiida-core still walks every list element
+        # when cleaning the `Dict`, but no longer has to convert each numpy scalar on the way.
+        for key, value in output_dict.items():
+            if isinstance(value, np.ndarray):
+                output_dict[key] = value.tolist()
+            elif key in ccData._listsofarrays:  #pylint: disable=protected-access
+                output_dict[key] = [array.tolist() for array in value]
+            elif key in ccData._dictsofarrays:  #pylint: disable=protected-access
+                output_dict[key] = {name: array.tolist() for name, array in value.items()}
 
         self.out('output_parameters', Dict(dict=output_dict))
 
@@ -43,12 +43,12 @@ def ccopen(source):
       Molpro, MOPAC, NWChem, ORCA, Psi3, Psi/Psi4, QChem, CJSON or None
       (if it cannot figure it out or the file does not exist).
     """
-    inputfile = None
-
-    inputfile = logfileparser.openlogfile(source)
+    # Streams are handed to the parser as they are, closing them here would make them unusable.
+    if isinstance(source, str):
+        inputfile = logfileparser.openlogfile(source)
+        inputfile.seek(0, 0)
+        inputfile.close()
 
     filetype = orcaparser.ORCA
 
-    inputfile.seek(0, 0)
-    inputfile.close()
     return filetype(source)